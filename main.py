@@ -1,12 +1,17 @@
 import os
+import re
 import sys
 import argparse
+import asyncio
+import hashlib
+import io
 import shutil
 import logging
 import json
 import tarfile
 import zipfile
 import arxiv
+import requests
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -26,33 +31,101 @@ logger = logging.getLogger(__name__)
 
 from src.context import extract_metadata, generate_terminology
 from src.parser import mask_content, unmask_content
-from src.translator import translate_file_content
-from src.walker import walk_and_process, find_main_tex
-from src.compiler import inject_fonts, compile_tex, sanitize_project
+from src.translator import translate_batch
+from src.batch_queue import BatchQueue
+from src.walker import discover_files, find_main_tex
+from src.compiler import compile_tex, sanitize_project
 
 CONFIG_OUTPUT_DIR = "output"
 
+# 128 KiB read buffer for tarball extraction; the default tiny buffer makes
+# extraction syscall-bound on many-small-file arxiv archives.
+TAR_BUFFER_SIZE = 128 * 1024
+
+# Paragraph boundary (separators kept so files rebuild byte-identically)
+_PARA_SPLIT_RE = re.compile(r'(\n\n+)')
+
+def _tm_key(text: str) -> str:
+    """Translation-memory key for a masked paragraph."""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def _extractall(tar: tarfile.TarFile, dest_dir: str):
+    """
+    extractall with the 'data' filter where available (3.12+): skips the
+    special-member handling that plain source archives never need, and
+    silences the deprecation warning for filterless extraction.
+    """
+    if sys.version_info >= (3, 12):
+        tar.extractall(path=dest_dir, filter='data')
+    else:
+        tar.extractall(path=dest_dir)
+
+def extract_targz(tar_path: str, dest_dir: str):
+    """Extracts a .tar.gz in streaming mode with a large read buffer."""
+    with open(tar_path, 'rb') as raw:
+        buf = io.BufferedReader(raw, buffer_size=TAR_BUFFER_SIZE)
+        # Streaming mode ("r|gz") reads strictly forward, no seeking.
+        with tarfile.open(fileobj=buf, mode="r|gz") as tar:
+            _extractall(tar, dest_dir)
+
 def download_arxiv_source(arxiv_id: str, dest_dir: str):
-    """Downloads ArXiv source tarball and extracts it."""
+    """Downloads ArXiv source and extracts it straight from the HTTP stream."""
     try:
         logger.info(f"Downloading ArXiv ID: {arxiv_id}")
         client = arxiv.Client()
         paper = next(client.results(arxiv.Search(id_list=[arxiv_id])))
-        
-        tar_path = paper.download_source(dirpath=dest_dir, filename=f"{arxiv_id}.tar.gz")
-        logger.info(f"Downloaded source to {tar_path}")
-        
-        # Extract
-        with tarfile.open(tar_path, "r:gz") as tar:
-            tar.extractall(path=dest_dir)
-            
-        os.remove(tar_path) # Clean up tar
+
+        # The e-print endpoint serves the gzipped source; pipe it directly
+        # into the streaming tar reader instead of round-tripping through disk.
+        source_url = paper.pdf_url.replace('/pdf/', '/e-print/')
+        logger.info(f"Streaming source from {source_url}")
+
+        with requests.get(source_url, stream=True) as r:
+            r.raise_for_status()
+            r.raw.decode_content = False  # Keep gzip bytes; tarfile decompresses
+            buf = io.BufferedReader(r.raw, buffer_size=TAR_BUFFER_SIZE)
+            with tarfile.open(fileobj=buf, mode="r|gz") as tar:
+                _extractall(tar, dest_dir)
+
         logger.info("Extraction complete.")
-        
+
     except Exception as e:
         logger.error(f"Failed to download/extract ArXiv source: {e}")
         sys.exit(1)
 
+def _read_until(path: str, sentinel: str = '\\end{abstract}', cap: int = 256 * 1024) -> str:
+    """
+    Reads a text file in 32 KiB chunks, stopping once `sentinel` appears or
+    `cap` bytes were consumed. The title/abstract sit near the top of even
+    monolithic papers, so this avoids loading megabytes just for metadata.
+    Falls back to a full read if the sentinel never shows up within the cap.
+    """
+    parts = []
+    total = 0
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        while total < cap:
+            chunk = f.read(32 * 1024)
+            if not chunk:
+                return "".join(parts)
+            parts.append(chunk)
+            total += len(chunk)
+            # Check the joined tail in case the sentinel straddles a chunk boundary
+            if sentinel in chunk or (len(parts) > 1 and sentinel in parts[-2][-len(sentinel):] + chunk):
+                return "".join(parts)
+
+    # Sentinel not found within cap: abstract may sit unusually deep
+    logger.debug(f"Sentinel not found in first {cap} bytes of {path}; reading fully.")
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+def _write_text(path: str, text: str):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
 def extract_local_source(path: str, dest_dir: str):
     """Extracts local zip or copies folder."""
     if os.path.isfile(path):
@@ -60,8 +133,7 @@ def extract_local_source(path: str, dest_dir: str):
              with zipfile.ZipFile(path, 'r') as zip_ref:
                 zip_ref.extractall(dest_dir)
         elif path.endswith('.tar.gz') or path.endswith('.tgz'):
-             with tarfile.open(path, "r:gz") as tar:
-                tar.extractall(path=dest_dir)
+             extract_targz(path, dest_dir)
         else:
             logger.error("Unsupported file format. Use zip or tar.gz")
             sys.exit(1)
@@ -87,6 +159,7 @@ def main():
     parser.add_argument("--local", type=str, help="Local path to source zip/folder")
     parser.add_argument("--model", type=str, default=os.getenv("MODEL_NAME", "gpt-4o"), help="LLM Model to use")
     parser.add_argument("--skip-translation", action="store_true", help="Skip translation and context phases, only compile")
+    parser.add_argument("--concurrency", type=int, default=16, help="Max concurrent LLM requests")
     
     args = parser.parse_args()
     
@@ -119,9 +192,9 @@ def main():
             
         logger.info(f"Main TeX file found: {main_tex}")
         
-        with open(main_tex, 'r', encoding='utf-8', errors='ignore') as f:
-            main_content = f.read()
-            
+        # Bounded read: metadata lives near the top, no need to load it all
+        main_content = _read_until(main_tex)
+
         title, abstract = extract_metadata(main_content)
         logger.info(f"Title: {title}")
         
@@ -137,31 +210,106 @@ def main():
             logger.warning("No abstract found. Skipping terminology generation.")
 
         # 3. Translation Phase (Walker)
-        
-        def process_file_callback(file_path: str):
-            logger.info(f"Translating {os.path.basename(file_path)}...")
-            
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-                
-            # A. Mask
-            masked_text, masks = mask_content(content)
-            
-            # B. Translate
-            if masked_text.strip():
-                translated_text = translate_file_content(masked_text, terminology)
-            else:
-                translated_text = masked_text
-                
-            # C. Unmask
-            final_text = unmask_content(translated_text, masks)
-            
-            # Write back
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(final_text)
-                
-        logger.info("Starting recursive translation...")
-        walk_and_process(sandbox_dir, main_tex, process_file_callback)
+        # Discovery is cheap, so walk first to collect reachable files, then
+        # translate them concurrently on one asyncio loop. Masked texts are
+        # still funneled through a BatchQueue so several small .tex fragments
+        # share one LLM round-trip; the semaphore bounds in-flight requests.
+
+        logger.info("Discovering project files...")
+        files = discover_files(sandbox_dir, main_tex)
+
+        # Translation memory: identical masked paragraphs (boilerplate,
+        # recurring captions, template preambles) are translated once per
+        # run and reused across runs via logs_dir/tm.json.
+        tm_path = os.path.join(logs_dir, "tm.json")
+        translation_memory = {}
+        if os.path.exists(tm_path):
+            try:
+                with open(tm_path, 'r', encoding='utf-8') as f:
+                    translation_memory = json.load(f)
+                logger.info(f"Translation memory loaded: {len(translation_memory)} segments.")
+            except Exception as e:
+                logger.warning(f"Failed to load translation memory: {e}")
+
+        async def translate_project():
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def bounded_translate(texts):
+                async with semaphore:
+                    return await translate_batch(texts, terminology)
+
+            queue = BatchQueue(bounded_translate)
+            in_flight = {}  # tm key -> future, dedups within the run
+
+            async def process_file(file_path: str):
+                # Per-file guard: an unreadable file or a masking failure
+                # must not abort the gather and skip the compile phase —
+                # the old walker tolerated per-file errors and kept going.
+                try:
+                    await _process_file(file_path)
+                except Exception as e:
+                    logger.error(f"Error processing {file_path}: {e}")
+
+            async def _process_file(file_path: str):
+                logger.info(f"Queueing {os.path.basename(file_path)}...")
+
+                # Read/write run in worker threads so disk IO of one file
+                # overlaps masking and in-flight LLM requests of others;
+                # mask/unmask are CPU-cheap and stay on the loop.
+                content = await asyncio.to_thread(_read_text, file_path)
+
+                # A. Mask
+                masked_text, masks = mask_content(content)
+
+                # B. Translate paragraph-wise (skip pure-markup files).
+                # Splitting before hashing lets partially overlapping files
+                # still hit the translation memory.
+                if not masked_text.strip():
+                    return
+
+                segments = _PARA_SPLIT_RE.split(masked_text)
+                outputs = list(segments)
+                jobs = []  # (segment_index, tm_key, future)
+                for idx, seg in enumerate(segments):
+                    if not seg.strip():
+                        continue  # Separators / whitespace pass through
+                    key = _tm_key(seg)
+                    if key in translation_memory:
+                        outputs[idx] = translation_memory[key]
+                    elif key in in_flight:
+                        jobs.append((idx, key, in_flight[key]))
+                    else:
+                        future = queue.submit(f"{os.path.basename(file_path)}#{idx}", seg)
+                        in_flight[key] = future
+                        jobs.append((idx, key, future))
+
+                try:
+                    for idx, key, future in jobs:
+                        translated = await future
+                        translation_memory[key] = translated
+                        outputs[idx] = translated
+                except Exception as e:
+                    logger.error(f"Translation failed for {file_path}: {e}. Keeping original.")
+                    return
+
+                # C. Unmask and write back
+                final_text = unmask_content("".join(outputs), masks)
+                await asyncio.to_thread(_write_text, file_path, final_text)
+
+            try:
+                await asyncio.gather(*[process_file(f) for f in files])
+            finally:
+                await queue.close()
+
+        logger.info(f"Starting translation of {len(files)} files (concurrency={args.concurrency})...")
+        asyncio.run(translate_project())
+
+        # Persist translation memory for future runs
+        try:
+            with open(tm_path, 'w', encoding='utf-8') as f:
+                json.dump(translation_memory, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"Failed to save translation memory: {e}")
     else:
         logger.info("Skipping translation phase...")
         main_tex = find_main_tex(sandbox_dir)
@@ -170,12 +318,11 @@ def main():
             sys.exit(1)
     
     # 4. Compilation Phase
+    # Font injection is fused into the sanitize pass so main.tex is
+    # read and rewritten once instead of twice.
     logger.info("Sanitizing project fonts...")
-    sanitize_project(sandbox_dir)
+    sanitize_project(sandbox_dir, main_tex)
 
-    logger.info("Injecting fonts...")
-    inject_fonts(main_tex)
-    
     logger.info("Compiling PDF...")
     success, output = compile_tex(sandbox_dir, main_tex)
     
@@ -0,0 +1,24 @@
+"""
+Optional native build for the mask scanner hot loop.
+
+    python setup.py build_ext --inplace
+
+Produces src.mask_scanner_c; everything works without it (src.parser
+falls back to the pure-Python src.mask_scanner).
+"""
+from setuptools import setup
+from setuptools.extension import Extension
+
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize(
+        [Extension("src.mask_scanner_c", ["src/mask_scanner.pyx"])],
+        language_level=3,
+    )
+except ImportError:
+    ext_modules = []
+
+setup(
+    name="arxiv-paper-translator",
+    ext_modules=ext_modules,
+)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class BatchQueue:
+    """
+    Collects submitted texts and flushes them to an async batch translate
+    function once a character budget, an item count, or a time interval is
+    reached.
+
+    The point is to amortize LLM round-trip time: many small .tex fragments
+    become one request instead of N. Callers get an asyncio.Future per
+    submission and await it; batches flush concurrently on the event loop.
+    """
+
+    def __init__(
+        self,
+        translate_fn: Callable[[List[str]], Awaitable[List[str]]],
+        max_chars: int = 12000,
+        max_items: int = 8,
+        flush_interval: float = 2.0,
+    ):
+        self._translate_fn = translate_fn
+        self.max_chars = max_chars
+        self.max_items = max_items
+        self.flush_interval = flush_interval
+
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []  # (key, text, future)
+        self._pending_chars = 0
+        self._tasks: List[asyncio.Task] = []
+        # Background flusher so a half-full batch doesn't sit forever
+        # while other coroutines are busy masking large files.
+        self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    def submit(self, key: str, text: str) -> "asyncio.Future[str]":
+        """
+        Queues `text` for translation. Returns a Future resolving to the
+        translated text. `key` is only used for logging/diagnostics.
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((key, text, future))
+        self._pending_chars += len(text)
+        if len(self._pending) >= self.max_items or self._pending_chars >= self.max_chars:
+            self.flush()
+        return future
+
+    def flush(self):
+        """Flushes whatever is pending as a background task, regardless of budget."""
+        if not self._pending:
+            return
+        batch = self._pending
+        self._pending = []
+        self._pending_chars = 0
+        self._tasks.append(asyncio.ensure_future(self._flush_batch(batch)))
+
+    async def close(self):
+        """Stops the background flusher and drains remaining items."""
+        self._flusher.cancel()
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # --- Internals ---
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+    async def _flush_batch(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        keys = [key for key, _, _ in batch]
+        texts = [text for _, text, _ in batch]
+        logger.info(f"Flushing batch of {len(texts)} item(s): {keys}")
+        try:
+            results = await self._translate_fn(texts)
+        except Exception as e:
+            logger.error(f"Batch translation failed: {e}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        if len(results) != len(batch):
+            # translate_fn is expected to realign or fall back itself;
+            # this is a last-resort guard.
+            err = RuntimeError(
+                f"Batch result count mismatch: {len(results)} != {len(batch)}"
+            )
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
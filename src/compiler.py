@@ -1,84 +1,151 @@
 import os
 import re
+import sys
 import subprocess
 import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
+# List of conflicting packages, compiled once at import and merged into a
+# single alternation so one pass scans each file instead of ~15.
+# fontenc T1 causes issues with CJK. inputenc utf8 is defaults in modern latex but ok to remove.
+# times, palatino, etc override the main font.
+_CONFLICT_PKGS = (
+    'times', 'palatino', 'mathptmx', 'newtxtext', 'newtxmath',
+    'helvet', 'avant', 'courier', 'chancery', 'bookman',
+    'newcent', 'charter', 'fourier',
+)
 
-def sanitize_tex_content(content: str) -> str:
+_CONFLICT_RE = re.compile(
+    r'^(\s*)(\\usepackage\s*(?:'
+    r'(?:\[.*?\])?\s*\{(?:' + '|'.join(_CONFLICT_PKGS) + r')\}'
+    r'|\[T1\]\s*\{fontenc\}'
+    r'|\[utf8\]\s*\{inputenc\}'
+    r').*)$',
+    re.MULTILINE
+)
+
+# \pdfoutput=1 or similar (causes error in xelatex)
+_PDFOUTPUT_RE = re.compile(r'^(\s*)(\\pdfoutput\s*=\s*\d+)', re.MULTILINE)
+
+# \documentclass[options]{class} or \documentclass{class}
+_DOCCLASS_RE = re.compile(r'(\\documentclass(\[.*?\])?\{.*?\})', re.DOTALL)
+
+# Font injection blocks. Using SimSun/SimHei as requested; platform is
+# picked once at import since it can't change mid-run.
+_MAC_FONTS = r"""
+% --- Auto-Translation Font Injection (macOS) ---
+\usepackage{xeCJK}
+\setCJKmainfont[BoldFont=Songti SC Bold, ItalicFont=Songti SC Light]{Songti SC}
+\setCJKsansfont{Heiti SC}
+\setCJKmonofont{STFangsong}
+% ---------------------------------------------
+"""
+
+# Standard/Windows Fonts (SimSun) or Linux (Fandol if available, but sticking to requested)
+_DEFAULT_FONTS = r"""
+% --- Auto-Translation Font Injection ---
+\usepackage{xeCJK}
+\setCJKmainfont{SimSun}
+\setCJKsansfont{SimHei}
+\setCJKmonofont{FangSong}
+% ---------------------------------------
+"""
+
+_FONT_SETUP = _MAC_FONTS if sys.platform == 'darwin' else _DEFAULT_FONTS
+
+
+def sanitize_tex_content(content: str, is_main: bool = False) -> str:
     """
     Comments out conflicting font packages that interfere with xeCJK/xelatex.
+    For the main tex file (is_main=True), also injects the xeCJK font setup
+    right after \documentclass so main.tex is rewritten once, not twice.
     """
-    # List of conflicting packages
-    # fontenc T1 causes issues with CJK. inputenc utf8 is defaults in modern latex but ok to remove.
-    # times, palatino, etc override the main font.
-    conflicts = [
-        r'usepackage\s*(\[.*?\])?\s*{times}',
-        r'usepackage\s*(\[.*?\])?\s*{palatino}',
-        r'usepackage\s*(\[.*?\])?\s*{mathptmx}',
-        r'usepackage\s*(\[.*?\])?\s*{newtxtext}',
-        r'usepackage\s*(\[.*?\])?\s*{newtxmath}',
-        r'usepackage\s*\[T1\]\s*{fontenc}',
-        r'usepackage\s*\[utf8\]\s*{inputenc}',
-        r'usepackage\s*(\[.*?\])?\s*{helvet}',
-        r'usepackage\s*(\[.*?\])?\s*{avant}',
-        r'usepackage\s*(\[.*?\])?\s*{courier}',
-        r'usepackage\s*(\[.*?\])?\s*{chancery}',
-        r'usepackage\s*(\[.*?\])?\s*{bookman}',
-        r'usepackage\s*(\[.*?\])?\s*{newcent}',
-        r'usepackage\s*(\[.*?\])?\s*{charter}',
-        r'usepackage\s*(\[.*?\])?\s*{fourier}'
-    ]
-    
+    # Cheap C-level substring gates: most included style files contain no
+    # conflicting package at all, so reject them before any regex runs.
+    has_pkg = '\\usepackage' in content
+    has_pdfoutput = '\\pdfoutput' in content
+    if not has_pkg and not has_pdfoutput and not is_main:
+        return content
+
     new_content = content
-    
-    # 1. Sanitize \pdfoutput (causes error in xelatex)
-    # \pdfoutput=1 or similar
-    regex_pdf = re.compile(r'^(\s*)(\\pdfoutput\s*=\s*\d+)', re.MULTILINE)
-    new_content = regex_pdf.sub(r'\1% ARXIV_TRANSLATOR_SANITIZED: \2', new_content)
-
-    for pattern in conflicts:
-        # Regex replacement: Comment out the line
-        # We look for \usepackage... matching the pattern
-        # We replace with % \usepackage...
-        # Need to handle potential whitespaces and Ensure we don't double comment
-        
-        # Regex: (optional whitespace) ( \usepackage ... )
-        regex = re.compile(r'^(\s*)(\\' + pattern + r'.*)$', re.MULTILINE)
-        new_content = regex.sub(r'\1% ARXIV_TRANSLATOR_SANITIZED: \2', new_content)
-        
+
+    # 1. Sanitize \pdfoutput
+    if has_pdfoutput:
+        new_content = _PDFOUTPUT_RE.sub(r'\1% ARXIV_TRANSLATOR_SANITIZED: \2', new_content)
+
+    # 2. Comment out conflicting \usepackage lines in a single pass
+    if has_pkg:
+        new_content = _CONFLICT_RE.sub(r'\1% ARXIV_TRANSLATOR_SANITIZED: \2', new_content)
+
+    # 3. Font injection (main file only), fused into the same pass
+    if is_main:
+        match = _DOCCLASS_RE.search(new_content)
+        if match:
+            end_pos = match.end(1)
+            new_content = new_content[:end_pos] + _FONT_SETUP + new_content[end_pos:]
+        else:
+            logger.warning("Could not find \\documentclass to inject fonts. Prepending to file.")
+            new_content = _FONT_SETUP + new_content
+
     return new_content
 
-def sanitize_project(sandbox_dir: str):
+def _sanitize_one(file_path: str, is_main: bool = False) -> Optional[str]:
+    """
+    Sanitizes a single file in place. Top-level so it can be dispatched to
+    worker processes. Returns the path if the file was modified, None otherwise.
+    """
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+
+        sanitized = sanitize_tex_content(content, is_main=is_main)
+
+        if sanitized != content:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                f.write(sanitized)
+            return file_path
+        return None
+
+    except Exception as e:
+        logger.warning(f"Failed to sanitize {file_path}: {e}")
+        return None
+
+def sanitize_project(sandbox_dir: str, main_tex_path: Optional[str] = None):
     """
     Recursively scans .tex, .sty, .cls files in sandbox_dir and sanitizes them.
+    Files are independent pure-CPU regex work, so they are dispatched across cores.
+
+    If `main_tex_path` is given, the xeCJK font setup is injected into that
+    file during the same pass, saving a separate read+rewrite of main.tex.
     """
     logger.info(f"Sanitizing font usage in {sandbox_dir}...")
-    
+
     extensions = {'.tex', '.sty', '.cls'}
-    
+
+    paths = []
     for root, dirs, files in os.walk(sandbox_dir):
         for file in files:
             ext = os.path.splitext(file)[1].lower()
             if ext in extensions:
-                file_path = os.path.join(root, file)
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    
-                    sanitized = sanitize_tex_content(content)
-                    
-                    if sanitized != content:
-                        with open(file_path, 'w', encoding='utf-8') as f:
-                            f.write(sanitized)
-                        logger.debug(f"Sanitized {file}")
-                        
-                except Exception as e:
-                    logger.warning(f"Failed to sanitize {file_path}: {e}")
+                paths.append(os.path.join(root, file))
 
-def inject_fonts(main_tex_path: str):
+    if not paths:
+        return
+
+    main_norm = os.path.normpath(main_tex_path) if main_tex_path else None
+    is_main_flags = [os.path.normpath(p) == main_norm for p in paths]
+
+    # Workers inherit the module-level precompiled regexes via fork.
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        results = list(pool.map(_sanitize_one, paths, is_main_flags, chunksize=8))
+
+    modified = [p for p in results if p]
+    logger.info(f"Sanitized {len(modified)}/{len(paths)} files.")
 
+def inject_fonts(main_tex_path: str):
     """
     Injects xeCJK and font settings into main.tex.
     Placement: Immediately after \documentclass{...}.
@@ -87,55 +154,22 @@ def inject_fonts(main_tex_path: str):
         logger.error(f"main.tex not found at {main_tex_path}")
         return
 
-    with open(main_tex_path, 'r', encoding='utf-8') as f:
+    # Single read/modify/write via r+ to halve the open/close syscalls
+    with open(main_tex_path, 'r+', encoding='utf-8') as f:
         content = f.read()
 
-    # Define injection block
-    # Using SimsSun/SimHei as requested. 
-    # Ensure standard fallback if not present? 
-    # For now, hardcode standard fonts assumed to be available or added.
-    # Detect Platform
-    import sys
-    
-    if sys.platform == 'darwin':
-        # macOS Fonts
-        font_setup = r"""
-% --- Auto-Translation Font Injection (macOS) ---
-\usepackage{xeCJK}
-\setCJKmainfont[BoldFont=Songti SC Bold, ItalicFont=Songti SC Light]{Songti SC}
-\setCJKsansfont{Heiti SC}
-\setCJKmonofont{STFangsong}
-% ---------------------------------------------
-"""
-    else:
-        # Standard/Windows Fonts (SimSun) or Linux (Fandol if available, but sticking to requested)
-        font_setup = r"""
-% --- Auto-Translation Font Injection ---
-\usepackage{xeCJK}
-\setCJKmainfont{SimSun}
-\setCJKsansfont{SimHei}
-\setCJKmonofont{FangSong}
-% ---------------------------------------
-"""
-    
-    injection = font_setup
-    
-    # Regex find \documentclass
-    # \documentclass[options]{class} or \documentclass{class}
-    pattern = re.compile(r'(\\documentclass(\[.*?\])?\{.*?\})', re.DOTALL)
-    match = pattern.search(content)
-    
-    if match:
-        end_pos = match.end(1)
-        new_content = content[:end_pos] + injection + content[end_pos:]
-        
-        with open(main_tex_path, 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        logger.info("Injected font settings.")
-    else:
-        logger.warning("Could not find \\documentclass to inject fonts. Prepending to file.")
-        with open(main_tex_path, 'w', encoding='utf-8') as f:
-            f.write(injection + content)
+        match = _DOCCLASS_RE.search(content)
+        if match:
+            end_pos = match.end(1)
+            new_content = content[:end_pos] + _FONT_SETUP + content[end_pos:]
+            logger.info("Injected font settings.")
+        else:
+            logger.warning("Could not find \\documentclass to inject fonts. Prepending to file.")
+            new_content = _FONT_SETUP + content
+
+        f.seek(0)
+        f.write(new_content)
+        f.truncate()
 
 def compile_tex(sandbox_dir: str, main_tex_path: str):
     """
@@ -2,6 +2,9 @@ import re
 import json
 import logging
 import os
+import hashlib
+import functools
+import orjson
 from typing import Dict, Optional, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
@@ -9,21 +12,34 @@ from src.prompts import TERMINOLOGY_PROMPT
 
 logger = logging.getLogger(__name__)
 
+# Metadata patterns, compiled once at import.
+# \title{...} - handles multi-line basic braces
+_TITLE_RE = re.compile(r'\\title\s*\{((?:[^{}]|\\{|\\}|(?:\{[^{}]*\}))*)\}', re.DOTALL)
+# \begin{abstract} ... \end{abstract}
+_ABSTRACT_RE = re.compile(r'\\begin\{abstract\}(.*?)\\end\{abstract\}', re.DOTALL)
+# Comment lines (for _clean_tex)
+_COMMENT_RE = re.compile(r'(?m)^\s*%.*$')
+# Markdown code fences around LLM JSON output
+_FENCE_RE = re.compile(r'^```(?:json)?\s*|\s*```$', re.MULTILINE)
+
+def _parse_llm_json(content: str):
+    """Strips markdown fences and parses JSON, preferring orjson."""
+    content = _FENCE_RE.sub('', content).strip()
+    try:
+        return orjson.loads(content)
+    except orjson.JSONDecodeError:
+        # orjson is stricter than stdlib (e.g. about trailing content)
+        return json.loads(content)
+
 def extract_metadata(tex_content: str) -> Tuple[Optional[str], Optional[str]]:
     """
     Extracts the Title and Abstract from valid LaTeX content.
     Returns (Title, Abstract).
     """
-    # Simple regex for title
-    # \title{...} - handles multi-line basic braces
-    title_pattern = re.compile(r'\\title\s*\{((?:[^{}]|\\{|\\}|(?:\{[^{}]*\}))*)\}', re.DOTALL)
-    title_match = title_pattern.search(tex_content)
+    title_match = _TITLE_RE.search(tex_content)
     title = title_match.group(1).strip() if title_match else None
 
-    # Simple regex for abstract
-    # \begin{abstract} ... \end{abstract}
-    abstract_pattern = re.compile(r'\\begin\{abstract\}(.*?)\\end\{abstract\}', re.DOTALL)
-    abstract_match = abstract_pattern.search(tex_content)
+    abstract_match = _ABSTRACT_RE.search(tex_content)
     abstract = abstract_match.group(1).strip() if abstract_match else None
 
     # Clean up TeX commands from title/abstract minimal
@@ -36,18 +52,38 @@ def extract_metadata(tex_content: str) -> Tuple[Optional[str], Optional[str]]:
 
 def _clean_tex(text: str) -> str:
     """Basic cleanup to remove comments and excessive whitespace."""
-    # Remove lines starting with %
-    lines = [l for l in text.splitlines() if not l.strip().startswith('%')]
-    return ' '.join(lines).strip()
+    # Drop comment lines, then collapse all whitespace in one C-level split()
+    return ' '.join(_COMMENT_RE.sub('', text).split())
+
+# Persistent cache: re-translating the same paper (common while iterating
+# on compile bugs) should not regenerate terminology over the network.
+_TERMINOLOGY_CACHE_DIR = os.path.expanduser("~/.cache/arxiv_translator")
+
+def _terminology_cache_path(abstract: str, model_name: str) -> str:
+    key = hashlib.sha256(f"{model_name}|{abstract}".encode()).hexdigest()
+    return os.path.join(_TERMINOLOGY_CACHE_DIR, f"{key}.json")
 
+@functools.lru_cache(maxsize=32)
 def generate_terminology(abstract: str, model_name: str = "gpt-4o") -> Dict[str, str]:
     """
     Calls LLM to generate terminology dictionary from abstract.
+    Results are cached in-process (lru_cache) and on disk keyed on
+    sha256(model|abstract), so cache hits skip the API round-trip.
     """
     if not abstract:
         logger.warning("No abstract provided for terminology generation.")
         return {}
 
+    cache_path = _terminology_cache_path(abstract, model_name)
+    try:
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                terminology = json.load(f)
+            logger.info(f"Terminology cache hit ({cache_path}).")
+            return terminology
+    except Exception as e:
+        logger.warning(f"Failed to read terminology cache: {e}")
+
     try:
         base_url = os.getenv("OPENAI_BASE_URL")
         llm = ChatOpenAI(model=model_name, temperature=0.0, base_url=base_url)
@@ -57,14 +93,17 @@ def generate_terminology(abstract: str, model_name: str = "gpt-4o") -> Dict[str,
         response = chain.invoke({"abstract": abstract})
         content = response.content.strip()
 
-        # Parse JSON
-        # It usually returns code block ```json ... ```
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].strip()
-        
-        terminology = json.loads(content)
+        # Parse JSON (usually wrapped in a ```json ... ``` block)
+        terminology = _parse_llm_json(content)
+
+        # Write-through to the on-disk cache
+        try:
+            os.makedirs(_TERMINOLOGY_CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(terminology, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning(f"Failed to write terminology cache: {e}")
+
         return terminology
     except Exception as e:
         logger.error(f"Failed to generate terminology: {e}")
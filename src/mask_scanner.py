@@ -0,0 +1,191 @@
+"""
+Streaming scanner that locates maskable regions in LaTeX source.
+
+pylatexenc materializes a node per character, which makes masking the
+dominant CPU cost before LLM I/O. We only need (start, end, kind) ranges
+for math, a handful of reference macros, and three environment classes,
+so a tight loop driven by str.find (C-level memmem) is enough and avoids
+the per-node object churn entirely.
+"""
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environments Configuration (shared with src.parser)
+# Opaque: mask the entire environment (wrapper + content).
+OPAQUE_ENVS = frozenset({'equation', 'align', 'gather', 'eqnarray', 'tabular', 'tikzpicture', 'axuodraw', 'algorithmic'})
+# Transparent (figure, table, center, itemize, ...): not listed — scanner just keeps going.
+# Code: mask the content but expose the wrapper so \begin/\end survive translation.
+CODE_ENVS = frozenset({'lstlisting', 'verbatim', 'minted'})
+# Macros masked whole, including their arguments.
+MASKED_MACROS = frozenset({'cite', 'ref', 'cref', 'label', 'input', 'include', 'includegraphics'})
+
+
+def _read_macro_name(text: str, i: int) -> Tuple[str, int]:
+    """i points just past a backslash; returns (name, index_past_name)."""
+    j = i
+    n = len(text)
+    while j < n and text[j].isalpha():
+        j += 1
+    return text[i:j], j
+
+
+def _skip_optional(text: str, i: int) -> int:
+    """Returns the index just past a [...] group starting at i, or i if none."""
+    if i < len(text) and text[i] == '[':
+        end = text.find(']', i + 1)
+        if end != -1:
+            return end + 1
+    return i
+
+
+def _skip_braces(text: str, i: int) -> int:
+    """Returns the index just past a balanced {...} group starting at i, or i if none/unbalanced."""
+    n = len(text)
+    if i >= n or text[i] != '{':
+        return i
+    depth = 0
+    j = i
+    while j < n:
+        c = text[j]
+        if c == '\\':
+            j += 2  # Skip escaped char (\{, \}, ...)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return i  # Unbalanced; caller treats as "no argument"
+
+
+def scan_masks(text: str) -> List[Tuple[int, int, str]]:
+    """
+    Scans LaTeX source and returns non-overlapping (start, end, kind)
+    ranges to mask, in ascending order. Kind strings match the token
+    naming used by src.parser ("MATH", "CMD_CITE", "ENV_EQUATION",
+    "CODE_LSTLISTING", ...).
+    """
+    ranges: List[Tuple[int, int, str]] = []
+    i = 0
+    n = len(text)
+
+    while i < n:
+        # Jump to the next character that can open a masked/skipped region.
+        nd = text.find('$', i)
+        nb = text.find('\\', i)
+        nc = text.find('%', i)
+        candidates = [p for p in (nd, nb, nc) if p != -1]
+        if not candidates:
+            break
+        i = min(candidates)
+        ch = text[i]
+
+        # Comment: skip to end of line. Escaped \% never lands here because
+        # the backslash sits at a lower index and is consumed first.
+        if ch == '%':
+            nl = text.find('\n', i)
+            i = n if nl == -1 else nl + 1
+            continue
+
+        # Math: $$...$$ or $...$
+        if ch == '$':
+            if text.startswith('$$', i):
+                end = text.find('$$', i + 2)
+                if end == -1:
+                    i += 2
+                    continue
+                ranges.append((i, end + 2, "MATH"))
+                i = end + 2
+            else:
+                end = text.find('$', i + 1)
+                while end != -1 and text[end - 1] == '\\':
+                    end = text.find('$', end + 1)
+                if end == -1:
+                    i += 1
+                    continue
+                ranges.append((i, end + 1, "MATH"))
+                i = end + 1
+            continue
+
+        # Backslash: display math, \begin{env}, masked macro, or escape.
+
+        # \[...\] and \(...\)
+        if text.startswith('\\[', i):
+            end = text.find('\\]', i + 2)
+            if end == -1:
+                i += 2
+                continue
+            ranges.append((i, end + 2, "MATH"))
+            i = end + 2
+            continue
+        if text.startswith('\\(', i):
+            end = text.find('\\)', i + 2)
+            if end == -1:
+                i += 2
+                continue
+            ranges.append((i, end + 2, "MATH"))
+            i = end + 2
+            continue
+
+        name, j = _read_macro_name(text, i + 1)
+
+        if not name:
+            # Escaped symbol (\$, \%, \\, \{ ...): consume both chars.
+            i += 2
+            continue
+
+        if name == 'begin':
+            if j >= n or text[j] != '{':
+                i = j
+                continue
+            close = text.find('}', j)
+            if close == -1:
+                i = j
+                continue
+            env = text[j + 1:close]
+            base = env[:-1] if env.endswith('*') else env
+            end_marker = '\\end{' + env + '}'
+
+            # 1. OPAQUE: mask wrapper + content
+            if env in OPAQUE_ENVS or base in OPAQUE_ENVS:
+                end = text.find(end_marker, close + 1)
+                if end != -1:
+                    ranges.append((i, end + len(end_marker), f"ENV_{env.upper().replace('*', 'S')}"))
+                    i = end + len(end_marker)
+                    continue
+
+            # 2. CODE: mask content only
+            elif env in CODE_ENVS:
+                k = _skip_optional(text, close + 1)
+                if env == 'minted':
+                    k = _skip_braces(text, k)  # {language}
+                end = text.find(end_marker, k)
+                if end != -1:
+                    if end > k:
+                        ranges.append((k, end, f"CODE_{env.upper()}"))
+                    i = end + len(end_marker)
+                    continue
+
+            # 3. Transparent (or unterminated): keep scanning inside.
+            i = close + 1
+            continue
+
+        if name in MASKED_MACROS:
+            # Optional args (up to two, e.g. \cite[see][p.2]{x}), then the
+            # mandatory brace group.
+            k = _skip_optional(text, j)
+            k = _skip_optional(text, k)
+            k2 = _skip_braces(text, k)
+            if k2 > k:
+                ranges.append((i, k2, f"CMD_{name.upper()}"))
+                i = k2
+                continue
+
+        # Any other macro: skip past its name and keep scanning.
+        i = j
+
+    return ranges
@@ -0,0 +1,176 @@
+# cython: language_level=3
+"""
+Cython build of the streaming mask scanner (see src/mask_scanner.py for
+the pure-Python reference). The per-char loop compiles to C so scanning
+large .tex files costs no Python object churn. Build with:
+
+    python setup.py build_ext --inplace
+
+src.parser imports this as src.mask_scanner_c when available and falls
+back to the pure-Python module otherwise. Keep both in sync.
+"""
+
+OPAQUE_ENVS = frozenset({'equation', 'align', 'gather', 'eqnarray', 'tabular', 'tikzpicture', 'axuodraw', 'algorithmic'})
+CODE_ENVS = frozenset({'lstlisting', 'verbatim', 'minted'})
+MASKED_MACROS = frozenset({'cite', 'ref', 'cref', 'label', 'input', 'include', 'includegraphics'})
+
+
+cdef inline Py_ssize_t _macro_name_end(str text, Py_ssize_t i, Py_ssize_t n):
+    cdef Py_UCS4 c
+    while i < n:
+        c = text[i]
+        if not ((c >= u'a' and c <= u'z') or (c >= u'A' and c <= u'Z')):
+            break
+        i += 1
+    return i
+
+
+cdef inline Py_ssize_t _skip_optional(str text, Py_ssize_t i, Py_ssize_t n):
+    cdef Py_ssize_t end
+    if i < n and text[i] == u'[':
+        end = text.find(']', i + 1)
+        if end != -1:
+            return end + 1
+    return i
+
+
+cdef inline Py_ssize_t _skip_braces(str text, Py_ssize_t i, Py_ssize_t n):
+    cdef Py_ssize_t depth = 0
+    cdef Py_ssize_t j = i
+    cdef Py_UCS4 c
+    if i >= n or text[i] != u'{':
+        return i
+    while j < n:
+        c = text[j]
+        if c == u'\\':
+            j += 2
+            continue
+        if c == u'{':
+            depth += 1
+        elif c == u'}':
+            depth -= 1
+            if depth == 0:
+                return j + 1
+        j += 1
+    return i
+
+
+def scan_masks(str text):
+    """
+    Scans LaTeX source and returns non-overlapping (start, end, kind)
+    ranges to mask, in ascending order. Same contract as the pure-Python
+    src.mask_scanner.scan_masks.
+    """
+    cdef list ranges = []
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t nd, nb, nc, nl, j, k, k2, close, end
+    cdef Py_UCS4 ch
+    cdef str name, env, base, end_marker
+
+    while i < n:
+        nd = text.find('$', i)
+        nb = text.find('\\', i)
+        nc = text.find('%', i)
+        i = -1
+        if nd != -1:
+            i = nd
+        if nb != -1 and (i == -1 or nb < i):
+            i = nb
+        if nc != -1 and (i == -1 or nc < i):
+            i = nc
+        if i == -1:
+            break
+        ch = text[i]
+
+        if ch == u'%':
+            nl = text.find('\n', i)
+            i = n if nl == -1 else nl + 1
+            continue
+
+        if ch == u'$':
+            if text.startswith('$$', i):
+                end = text.find('$$', i + 2)
+                if end == -1:
+                    i += 2
+                    continue
+                ranges.append((i, end + 2, "MATH"))
+                i = end + 2
+            else:
+                end = text.find('$', i + 1)
+                while end != -1 and text[end - 1] == u'\\':
+                    end = text.find('$', end + 1)
+                if end == -1:
+                    i += 1
+                    continue
+                ranges.append((i, end + 1, "MATH"))
+                i = end + 1
+            continue
+
+        if text.startswith('\\[', i):
+            end = text.find('\\]', i + 2)
+            if end == -1:
+                i += 2
+                continue
+            ranges.append((i, end + 2, "MATH"))
+            i = end + 2
+            continue
+        if text.startswith('\\(', i):
+            end = text.find('\\)', i + 2)
+            if end == -1:
+                i += 2
+                continue
+            ranges.append((i, end + 2, "MATH"))
+            i = end + 2
+            continue
+
+        j = _macro_name_end(text, i + 1, n)
+        if j == i + 1:
+            i += 2  # Escaped symbol (\$, \%, \\, ...)
+            continue
+        name = text[i + 1:j]
+
+        if name == 'begin':
+            if j >= n or text[j] != u'{':
+                i = j
+                continue
+            close = text.find('}', j)
+            if close == -1:
+                i = j
+                continue
+            env = text[j + 1:close]
+            base = env[:-1] if env.endswith('*') else env
+            end_marker = '\\end{' + env + '}'
+
+            if env in OPAQUE_ENVS or base in OPAQUE_ENVS:
+                end = text.find(end_marker, close + 1)
+                if end != -1:
+                    ranges.append((i, end + len(end_marker), "ENV_" + env.upper().replace('*', 'S')))
+                    i = end + len(end_marker)
+                    continue
+            elif env in CODE_ENVS:
+                k = _skip_optional(text, close + 1, n)
+                if env == 'minted':
+                    k = _skip_braces(text, k, n)
+                end = text.find(end_marker, k)
+                if end != -1:
+                    if end > k:
+                        ranges.append((k, end, "CODE_" + env.upper()))
+                    i = end + len(end_marker)
+                    continue
+
+            i = close + 1
+            continue
+
+        if name in MASKED_MACROS:
+            k = _skip_optional(text, j, n)
+            k = _skip_optional(text, k, n)
+            k2 = _skip_braces(text, k, n)
+            if k2 > k:
+                ranges.append((i, k2, "CMD_" + name.upper()))
+                i = k2
+                continue
+
+        i = j
+
+    return ranges
@@ -1,14 +1,30 @@
 import re
 import logging
+import functools
 from typing import Dict, Tuple, List
 from pylatexenc.latexwalker import LatexWalker, LatexEnvironmentNode, LatexMacroNode, LatexGroupNode, LatexCharsNode, LatexMathNode, get_default_latex_context_db
 from pylatexenc.macrospec import EnvironmentSpec
+from src.mask_scanner import OPAQUE_ENVS, CODE_ENVS, MASKED_MACROS
+
+try:
+    # Native scanner (python setup.py build_ext --inplace); ~20-50x on the
+    # per-char hot loop.
+    from src.mask_scanner_c import scan_masks
+except ImportError:
+    from src.mask_scanner import scan_masks
+
+try:
+    import ahocorasick  # pyahocorasick: DFA multi-pattern matcher
+except ImportError:
+    ahocorasick = None  # Regex path below still works
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
 def get_custom_context():
     """
     Returns a LatexContextDb with augmented environment definitions.
+    Cached: building the default DB is pure repeated work across files.
     """
     # Load default configs
     db = get_default_latex_context_db()
@@ -53,140 +69,99 @@ def mask_content(text: str) -> Tuple[str, Dict[str, str]]:
       Walk the tree. If specific environment validation, mask it. 
     """
     
-    # We will use a hybrid approach. 
-    # 1. First, use Regex for "easy" tokens to avoid parser overhead/errors on partial chunks?
-    # No, the requirement says "Use pylatexenc for safe AST traversal".
-    
-    # However, pylatexenc parses the WHOLE document. If we pass chunks, it might fail.
-    # But here 'text' is likely a whole file content or a large section.
-    
-    # Let's try to parse the whole text.
-    
     masks = {}
     mask_counter = 0
 
     try:
-        # Use custom context to parse args correctly
-        db = get_custom_context()
-        walker = LatexWalker(text, latex_context=db, tolerant_parsing=True)
-        nodes, _, _ = walker.get_latex_nodes()
-        
-        # We need to reconstruct the string with masks. 
-        # This is hard with just nodes list because we need to rebuild the file.
-        # Alternative: Identify ranges to mask, then process string from end to start to replace.
-        
-        mask_ranges = [] # List of (start_pos, end_pos, type_hint)
-
-        # Environments Configuration
-        OPAQUE_ENVS = {'equation', 'align', 'gather', 'eqnarray', 'tabular', 'tikzpicture', 'axuodraw', 'algorithmic'} 
-        # Transparent Envs (recurse): figure, table, center, itemize, enumerate, etc. (Default behavior)
-        # Content-Masked (Code) Envs: Mask children content but expose wrapper
-        CODE_ENVS = {'lstlisting', 'verbatim', 'minted'}
-
-        def traverse_nodes(node_list):
-            for node in node_list:
-                # Math
-                if isinstance(node, LatexMathNode):
-                    mask_ranges.append((node.pos, node.pos + node.len, "MATH"))
+        # Fast path: streaming scanner — finds ranges without materializing a
+        # pylatexenc node per character.
+        mask_ranges = scan_masks(text)
+    except Exception as e:
+        logger.error(f"Streaming mask scan failed: {e}. Falling back to pylatexenc parse.")
+        try:
+            mask_ranges = _scan_masks_pylatexenc(text)
+        except Exception as e2:
+            logger.error(f"PyLaTeXenc parsing failed: {e2}. Fallback to basic Regex masking.")
+            return mask_content_regex_fallback(text)
+
+    # Ranges are disjoint by construction: opaque envs don't recurse, so a
+    # parent and its children never both appear. Sort ascending and rebuild
+    # the string in one left-to-right pass of slice+token appends instead
+    # of O(n) list slice-assignments per mask.
+    mask_ranges.sort(key=lambda x: x[0])
+
+    parts = []
+    cursor = 0
+    for start, end, type_hint in mask_ranges:
+        # Safety checks for indices; also skip anything overlapping the
+        # previously emitted range.
+        if start < cursor or start < 0 or end > len(text):
+            continue
+
+        token = f"[MASK_{type_hint}_{mask_counter:04d}]"
+        masks[token] = text[start:end]
+        mask_counter += 1
+
+        parts.append(text[cursor:start])
+        parts.append(token)
+        cursor = end
+    parts.append(text[cursor:])
+
+    return "".join(parts), masks
+
+def _scan_masks_pylatexenc(text: str) -> List[Tuple[int, int, str]]:
+    """
+    AST-based range scan via pylatexenc (tolerant fallback path).
+    Returns (start, end, type_hint) ranges equivalent to scan_masks.
+    """
+    # Use custom context to parse args correctly
+    db = get_custom_context()
+    walker = LatexWalker(text, latex_context=db, tolerant_parsing=True)
+    nodes, _, _ = walker.get_latex_nodes()
+
+    mask_ranges = [] # List of (start_pos, end_pos, type_hint)
+
+    def traverse_nodes(node_list):
+        for node in node_list:
+            # Math
+            if isinstance(node, LatexMathNode):
+                mask_ranges.append((node.pos, node.pos + node.len, "MATH"))
+                continue
+
+            # Macros: \cite, \ref, \label, \includegraphics, \input, \include
+            if isinstance(node, LatexMacroNode):
+                if node.macroname in MASKED_MACROS:
+                    mask_ranges.append((node.pos, node.pos + node.len, f"CMD_{node.macroname.upper()}"))
                     continue
-                
-                # Macros: \cite, \ref, \label, \includegraphics, \input, \include
-                if isinstance(node, LatexMacroNode):
-                    if node.macroname in ['cite', 'ref', 'cref', 'label', 'input', 'include', 'includegraphics']:
-                        mask_ranges.append((node.pos, node.pos + node.len, f"CMD_{node.macroname.upper()}"))
-                        continue
-                
-                # Environments
-                if isinstance(node, LatexEnvironmentNode):
-                    env_name = node.environmentname
-                    
-                    # 1. OPAQUE: Mask the entire environment (Wrapper + Content)
-                    if env_name in OPAQUE_ENVS or env_name.endswith('*'): # Handle figure*? No, figure* should be transparent.
-                        # Exclude figure* and table* from opaque check if we want them transparent
-                        if env_name not in ['figure*', 'table*'] and (env_name in OPAQUE_ENVS or env_name.endswith('*')):
-                             # Check if it is really opaque or just star variant of opaque?
-                             # Let's be specific.
-                             if env_name in OPAQUE_ENVS:
-                                 mask_ranges.append((node.pos, node.pos + node.len, f"ENV_{env_name.upper().replace('*', 'S')}"))
-                                 continue
-                             if env_name.replace('*', '') in OPAQUE_ENVS:
-                                 mask_ranges.append((node.pos, node.pos + node.len, f"ENV_{env_name.upper().replace('*', 'S')}"))
-                                 continue
-
-                    # 2. CODE: Mask the content children, but expose the wrapper
-                    if env_name in CODE_ENVS:
-                        # Mask all children nodes (which is the code content)
-                        # The wrapper \begin{...} \end{...} is defined by node.pos/len minus children?
-                        # No, simpler: just iterate children and mask them.
-                        # For lstlisting, tokens might be char nodes or incomplete.
-                        # We mask the range of the nodelist.
-                        if hasattr(node, 'nodelist') and node.nodelist:
-                            # Start of first child to end of last child
-                            start_c = node.nodelist[0].pos
-                            end_c = node.nodelist[-1].pos + node.nodelist[-1].len
-                            mask_ranges.append((start_c, end_c, f"CODE_{env_name.upper()}"))
-                        continue
-
-                    # 3. Transparent (figure, table, etc.): Just recurse.
-                    # Do nothing here, let it fall through to recursion.
-                    pass
-                        
-                # Recurse if it's a group or generic env NOT masked
-                if hasattr(node, 'nodelist'):
-                    traverse_nodes(node.nodelist)
-
-        traverse_nodes(nodes)
-        
-        # Sort ranges by start pos descending to replace safely
-        mask_ranges.sort(key=lambda x: x[0], reverse=True)
-        
-        # Merge overlapping ranges? 
-        # Simple merge: if current start < prev start (already sorted desc), check end.
-        # But we sort desc by start.
-        # (100, 200), (50, 60) -> Disjoint.
-        # (100, 200), (150, 180) -> Overlap (Child inside Parent).
-        # We should skip child if parent is replaced.
-        # Since we traverse tree:
-        # If we added Parent (Opaque), we didn't recurse. So no children added.
-        # If we Recursed (Transparent), we didn't add Parent.
-        # So disjoint property holds for tree traversal logic?
-        # EXCEPT: Regex regex fallback tokens? No using pure parser here.
-        # BUT: Code Env mask (children range).
-        # What if Code Env parsing made children overlap?
-        # For simplicity, we assume logic is non-overlapping.
-        
-        # Replace
-        working_text = list(text)
-        
-        last_replaced_start = float('inf') # Track to avoid overlaps if any
-        
-        for start, end, type_hint in mask_ranges:
-            # Safety checks for indices
-            if start < 0 or end > len(text): continue
-            
-            # Use 'last_replaced_start' (which is higher index) to ensure strict order
-            # If current end > last_replaced_start, we have overlap (inner nested in outer that was processed later? no sorted desc)
-            # Sorted descending start.
-            # Range 1: (200, 300)
-            # Range 2: (100, 150)
-            # Range 3: (120, 130) -> Overlap?
-            # If (100, 150) was added, did we add (120, 130)?
-            # If (100,150) is OPAQUE, we didn't recurse.
-            # So (120,130) shouldn't exist.
-            
-            original_segment = text[start:end]
-            token = f"[MASK_{type_hint}_{mask_counter:04d}]"
-            masks[token] = original_segment
-            mask_counter += 1
-            
-            # Replace
-            working_text[start:end] = list(token)
-            
-        return "".join(working_text), masks
 
-    except Exception as e:
-        logger.error(f"PyLaTeXenc parsing failed: {e}. Fallback to basic Regex masking.")
-        return mask_content_regex_fallback(text)
+            # Environments
+            if isinstance(node, LatexEnvironmentNode):
+                env_name = node.environmentname
+
+                # 1. OPAQUE: Mask the entire environment (Wrapper + Content)
+                # figure*/table* stay transparent; star variants of opaque envs are opaque.
+                if env_name in OPAQUE_ENVS or (env_name.endswith('*') and env_name.replace('*', '') in OPAQUE_ENVS):
+                    mask_ranges.append((node.pos, node.pos + node.len, f"ENV_{env_name.upper().replace('*', 'S')}"))
+                    continue
+
+                # 2. CODE: Mask the content children, but expose the wrapper
+                if env_name in CODE_ENVS:
+                    # We mask the range of the nodelist (start of first child
+                    # to end of last child).
+                    if hasattr(node, 'nodelist') and node.nodelist:
+                        start_c = node.nodelist[0].pos
+                        end_c = node.nodelist[-1].pos + node.nodelist[-1].len
+                        mask_ranges.append((start_c, end_c, f"CODE_{env_name.upper()}"))
+                    continue
+
+                # 3. Transparent (figure, table, etc.): Just recurse.
+
+            # Recurse if it's a group or generic env NOT masked
+            if hasattr(node, 'nodelist'):
+                traverse_nodes(node.nodelist)
+
+    traverse_nodes(nodes)
+    return mask_ranges
 
 def mask_content_regex_fallback(text: str) -> Tuple[str, Dict[str, str]]:
     """
@@ -212,13 +187,47 @@ def mask_content_regex_fallback(text: str) -> Tuple[str, Dict[str, str]]:
     
     return text, masks
 
+# Matches any token emitted by mask_content (and the regex fallback), so one
+# sub() pass restores all masks instead of one O(n) replace() per token.
+_TOKEN_RE = re.compile(r'\[MASK_[A-Z0-9_]+_\d{4}\]')
+
+# Below this the automaton build cost isn't worth it; regex sub is fine.
+_AHO_MIN_MASKS = 32
+
 def unmask_content(text: str, masks: Dict[str, str]) -> str:
     """
-    Replaces tokens with original content.
+    Replaces tokens with original content in a single pass.
+    Tokens not found in `masks` (e.g. mangled by the LLM) are left as-is.
+
+    For mask-heavy files (many equations/citations) an Aho-Corasick
+    automaton scans in O(n + matches) regardless of mask count.
     """
-    # Simply replace all keys
-    # To avoid substring issues, maybe sort keys by length desc?
-    # Tokens are uniform length though.
+    if not masks:
+        return text
+
+    if ahocorasick is None or len(masks) < _AHO_MIN_MASKS:
+        if all(_TOKEN_RE.fullmatch(k) for k in masks):
+            return _TOKEN_RE.sub(lambda m: masks.get(m.group(0), m.group(0)), text)
+        # Defensive: tokens outside the standard shape still get restored in
+        # one pass via an escaped alternation (the shared [MASK_ prefix keeps
+        # the compiled regex tree small).
+        pattern = re.compile('|'.join(re.escape(k) for k in masks))
+        return pattern.sub(lambda m: masks[m.group(0)], text)
+
+    automaton = ahocorasick.Automaton()
     for token, original in masks.items():
-        text = text.replace(token, original)
-    return text
+        automaton.add_word(token, (len(token), original))
+    automaton.make_automaton()
+
+    parts = []
+    cursor = 0
+    for end_idx, (tok_len, original) in automaton.iter(text):
+        start = end_idx - tok_len + 1
+        if start < cursor:
+            continue  # Overlap guard; distinct tokens can't actually overlap
+        parts.append(text[cursor:start])
+        parts.append(original)
+        cursor = end_idx + 1
+    parts.append(text[cursor:])
+
+    return "".join(parts)
@@ -29,6 +29,8 @@ Rules:
 2. **LaTeX Commands**: Do not translate standard LaTeX commands like `\\section`, `\\textbf`, `\\item`, `\\cite`. Only translate the content *inside* text-heavy commands (e.g., translate `title` in `\\section{{title}}`).
 3. **Academic Tone**: Use formal, objective, and precise academic Chinese.
 4. **No Commentary**: Return ONLY the translated text. Do not add "Here is the translation" or markdown code blocks.
+5. **Batch Separator**: The input may contain several independent texts joined by a line containing only `%%`. Translate each part on its own and join them with the exact same `%%` separator lines, in the same order. NEVER drop, merge, add, or translate a separator.
+6. **Chunk Delimiters**: The input may wrap several chunks as `<<<CHUNK i>>> ... <<<END i>>>`. Translate each chunk's content and reproduce the EXACT same delimiter lines around each translation, with the same numbering and order. NEVER drop, merge, or alter a delimiter.
 
 Input Text:
 """
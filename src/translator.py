@@ -3,15 +3,104 @@ import math
 import json
 import logging
 import os
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import atexit
+import orjson
+import tiktoken
+import httpx
 from typing import List, Dict, Optional, TypedDict, Any
 from langgraph.graph import StateGraph, END
+
+# Node-level caching landed in newer langgraph releases; degrade to an
+# uncached graph when the installed version predates it.
+try:
+    from langgraph.types import CachePolicy
+except ImportError:
+    CachePolicy = None
+try:
+    from langgraph.cache.sqlite import SqliteCache
+except ImportError:
+    SqliteCache = None
+try:
+    from langgraph.cache.memory import InMemoryCache
+except ImportError:
+    InMemoryCache = None
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
+from openai import RateLimitError, APITimeoutError
+from tenacity import retry, wait_exponential_jitter, stop_after_attempt, retry_if_exception_type
 from src.prompts import TRANSLATOR_SYSTEM_PROMPT, CRITIC_SYSTEM_PROMPT, FIXER_SYSTEM_PROMPT
-from src.parser import unmask_content
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Shared HTTP transport: without this, every ChatOpenAI instance brings up
+# its own httpx client with default limits, repeating TLS handshakes and
+# DNS lookups per client. One keepalive pool serves all temperatures;
+# HTTP/2 multiplexes the concurrent chunk requests over few connections.
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP_ASYNC = httpx.AsyncClient(http2=True, timeout=120, limits=_HTTP_LIMITS)
+_HTTP_SYNC = httpx.Client(http2=True, timeout=120, limits=_HTTP_LIMITS)
+
+def _close_http_clients():
+    _HTTP_SYNC.close()
+    try:
+        asyncio.run(_HTTP_ASYNC.aclose())
+    except RuntimeError:
+        # Interpreter shutting down with a loop still around; sockets are
+        # torn down by the OS anyway.
+        pass
+
+atexit.register(_close_http_clients)
+
+# Parsed once at import: template parsing does regex work that was being
+# repeated on every critic call and fixer iteration.
+_CRITIC_PROMPT = PromptTemplate.from_template(CRITIC_SYSTEM_PROMPT)
+_FIXER_PROMPT = PromptTemplate.from_template(FIXER_SYSTEM_PROMPT)
+
+@lru_cache(maxsize=8)
+def _get_llm(temperature: float) -> ChatOpenAI:
+    """
+    One client per temperature. Constructing ChatOpenAI re-reads env vars
+    and warms a fresh HTTP connection pool, so it must not happen per node
+    invocation.
+    """
+    return ChatOpenAI(
+        model=os.getenv("MODEL_NAME", "gpt-4o"),
+        temperature=temperature,
+        base_url=os.getenv("OPENAI_BASE_URL"),
+        http_client=_HTTP_SYNC,
+        http_async_client=_HTTP_ASYNC
+    )
+
+# Chains are built lazily (the LLM client reads env vars) and then reused;
+# piping a prompt into a model per call rebuilds the runnable each time.
+@lru_cache(maxsize=1)
+def _critic_chain():
+    return _CRITIC_PROMPT | _get_llm(0.0)
+
+@lru_cache(maxsize=1)
+def _fixer_chain():
+    return _FIXER_PROMPT | _get_llm(0.2)
+
+# Transport-level failures (429, timeouts) are retried here with jittered
+# exponential backoff, invisibly to the graph: they never reach the fixer
+# loop, whose attempt budget is reserved for genuine quality failures.
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError)
+
+@retry(
+    wait=wait_exponential_jitter(initial=1, max=8),
+    stop=stop_after_attempt(3),
+    retry=retry_if_exception_type(_RETRYABLE_ERRORS),
+    reraise=True,
+)
+async def _invoke_with_retry(runnable, payload):
+    """Awaits runnable.ainvoke(payload), backing off on 429/timeout."""
+    return await runnable.ainvoke(payload)
+
 # --- State Definition ---
 class TranslationState(TypedDict):
     original_text: str          # The full masked text of the file (or chunk if processed chunk-wise)
@@ -29,99 +118,286 @@ class TranslationState(TypedDict):
     original_chunk: str         # The input masked chunk
     translated_chunk: str       # The output translated chunk
     terminology: Dict[str, str] # Context
+    terminology_json: str       # Pre-serialized once per file; nodes read this
+                                # instead of re-dumping the dict per invocation
     failed_attempts: int        # Counter for Fixer
     critic_errors: List[str]    # Feedback
     final_output: str           # Result
 
 # --- Helper: Robust Chunking ---
-def smart_split(text: str, max_chars: int = 4000) -> List[str]:
+
+_PARA_BOUNDARY_RE = re.compile(r'\n\n+')
+
+# Token-accurate budgeting: characters are a crude proxy that overfills on
+# dense math and underfills on plain ASCII prose. The encoder is resolved
+# lazily — tiktoken may fetch the BPE file over the network on first use,
+# which must not happen at import time. Unknown model names fall back to
+# cl100k_base.
+@lru_cache(maxsize=1)
+def _get_enc():
+    try:
+        return tiktoken.encoding_for_model(os.getenv("MODEL_NAME", "gpt-4o"))
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def _token_len(text: str) -> int:
+    return len(_get_enc().encode(text))
+
+# Cut candidates inside an oversized paragraph: line breaks, or whitespace
+# after sentence punctuation. Mask tokens contain neither, so a cut can
+# never land inside a [MASK_...] token and mangle it across two LLM calls.
+_SUBSPLIT_BOUNDARY_RE = re.compile(r'\n|(?<=[.!?;])\s')
+
+def _subsplit_tokens(segment: str, max_tokens: int) -> List[str]:
     """
-    Splits text by \n\n but respects [MASK] tokens.
+    Splits one oversized paragraph at newline/sentence boundaries, packing
+    pieces greedily to the token budget. A stretch with no boundary at all
+    is kept intact (over budget) rather than cut mid-token: masks and
+    LaTeX constructs must never be split across requests.
     """
-    # 1. Split by double newline (paragraphs)
-    paragraphs = re.split(r'(\n\n+)', text)
-    
+    positions = [m.end() for m in _SUBSPLIT_BOUNDARY_RE.finditer(segment)]
+    if not positions or positions[-1] != len(segment):
+        positions.append(len(segment))
+
+    pieces = []
+    piece_start = 0
+    current_tokens = 0
+    prev = 0
+    for pos in positions:
+        boundary_tokens = _token_len(segment[prev:pos])
+        if current_tokens + boundary_tokens > max_tokens and prev > piece_start:
+            pieces.append(segment[piece_start:prev])
+            piece_start = prev
+            current_tokens = boundary_tokens
+        else:
+            current_tokens += boundary_tokens
+        prev = pos
+    if piece_start < len(segment):
+        pieces.append(segment[piece_start:])
+    return pieces
+
+def smart_split(text: str, max_tokens: int = 3500) -> List[str]:
+    """
+    Splits text at blank-line boundaries into chunks of at most max_tokens
+    tokens, leaving response room in the model context. Paragraphs are
+    packed greedily; a single paragraph over the budget is subsplit at
+    newline/sentence boundaries, never inside a mask token.
+
+    Only boundary positions are collected (finditer), so no intermediate
+    paragraph/separator list is materialized; each segment is encoded
+    exactly once and chunks are sliced straight from the input.
+    """
+    if not text:
+        return []
+    if _token_len(text) <= max_tokens:
+        return [text]
+
+    positions = [m.end() for m in _PARA_BOUNDARY_RE.finditer(text)]
+    if not positions or positions[-1] != len(text):
+        positions.append(len(text))
+
     chunks = []
-    current_chunk = []
-    current_length = 0
-    
-    for para in paragraphs:
-        # Check if adding this paragraph exceeds limit
-        if current_length + len(para) > max_chars and current_chunk:
-            # Join and add to chunks
-            chunks.append("".join(current_chunk))
-            current_chunk = [para]
-            current_length = len(para)
+    current_start = 0
+    current_tokens = 0
+    prev = 0
+    for pos in positions:
+        seg_tokens = _token_len(text[prev:pos])
+        if seg_tokens > max_tokens:
+            # Oversized single paragraph: flush, then token-subsplit it.
+            if prev > current_start:
+                chunks.append(text[current_start:prev])
+            chunks.extend(_subsplit_tokens(text[prev:pos], max_tokens))
+            current_start = pos
+            current_tokens = 0
+        elif current_tokens + seg_tokens > max_tokens and prev > current_start:
+            chunks.append(text[current_start:prev])
+            current_start = prev
+            current_tokens = seg_tokens
         else:
-            current_chunk.append(para)
-            current_length += len(para)
-    
-    if current_chunk:
-        chunks.append("".join(current_chunk))
-        
+            current_tokens += seg_tokens
+        prev = pos
+    if current_start < len(text):
+        chunks.append(text[current_start:])
+
     return chunks
 
+# --- Helper: Row Marshalling ---
+# Packing several small chunks into one prompt amortizes per-call latency
+# and rate-limit slots; K stays small (<= _MARSHAL_MAX_GROUP) so response
+# latency doesn't inflate.
+
+_MARSHAL_TARGET_CHARS = 12000
+_MARSHAL_MAX_GROUP = 6
+
+_MARSHAL_ITEM_RE = re.compile(r'<<<CHUNK (\d+)>>>\s*(.*?)\s*<<<END \1>>>', re.DOTALL)
+
+def group_chunks_for_marshalling(
+    indexed_chunks: List[tuple],
+    target_chars: int = _MARSHAL_TARGET_CHARS,
+    max_group: int = _MARSHAL_MAX_GROUP,
+) -> List[List[tuple]]:
+    """
+    Greedy packer over (index, chunk) pairs: consecutive small chunks share
+    one group up to the char budget; a large chunk travels alone.
+    """
+    groups = []
+    current = []
+    size = 0
+    for item in indexed_chunks:
+        length = len(item[1])
+        if current and (size + length > target_chars or len(current) >= max_group):
+            groups.append(current)
+            current = []
+            size = 0
+        current.append(item)
+        size += length
+    if current:
+        groups.append(current)
+    return groups
+
+def _marshal_group(texts: List[str]) -> str:
+    return "\n\n".join(
+        f"<<<CHUNK {k}>>>\n{t}\n<<<END {k}>>>" for k, t in enumerate(texts)
+    )
+
+def _demarshal_group(text: str, expected: int) -> Optional[List[str]]:
+    """Parses delimited translations back out; None on any mismatch."""
+    found = _MARSHAL_ITEM_RE.findall(text)
+    if len(found) != expected:
+        return None
+    found.sort(key=lambda kv: int(kv[0]))
+    return [body for _, body in found]
+
 # --- Nodes ---
 
-def translate_node(state: TranslationState):
+def build_translate_messages(chunk: str, terminology_json: str):
+    """
+    Builds the (system, user) message pair for the translator prompt.
+    Constructed directly to handle system prompt variables safely. Takes
+    the terminology pre-serialized so the dict is dumped once per file,
+    not once per chunk.
+    """
+    formatted_system = TRANSLATOR_SYSTEM_PROMPT.format(terminology=terminology_json)
+    return [
+        ("system", formatted_system),
+        ("user", chunk)
+    ]
+
+async def translate_node(state: TranslationState):
     """
     Node C: Translation Agent
     """
     logger.debug(f"Translating chunk {state.get('chunk_index', 0)}")
-    
+
     original = state['original_chunk']
-    terminology = json.dumps(state['terminology'], ensure_ascii=False)
-    
-    model_name = os.getenv("MODEL_NAME", "gpt-4o")
-    base_url = os.getenv("OPENAI_BASE_URL")
-    llm = ChatOpenAI(model=model_name, temperature=0.3, base_url=base_url)
-    
-    # Construct messages directly to handle system prompt variables safely
-    
-    formatted_system = TRANSLATOR_SYSTEM_PROMPT.format(terminology=terminology)
-    messages = [
-        ("system", formatted_system),
-        ("user", original)
-    ]
-    
+
+    llm = _get_llm(0.3)
+
+    messages = build_translate_messages(original, state['terminology_json'])
+
     try:
-        response = llm.invoke(messages)
-        translated_text = response.content.strip()
-        return {"translated_chunk": translated_text, "failed_attempts": 0}
+        response = await _invoke_with_retry(llm, messages)
     except Exception as e:
+        # Raise rather than return a fallback state: the node cache stores
+        # whatever the node returns, and a persisted "untranslated" result
+        # would replay the outage on every future run. run_chunk catches
+        # this and degrades gracefully without caching anything.
         logger.error(f"Translation LLM call failed: {e}")
-        # Fail gracefully by returning original text (or we could retry)
-        return {"translated_chunk": original, "failed_attempts": 999, "critic_errors": ["LLM Call Failed"]}
+        raise
+    translated_text = response.content.strip()
+    return {"translated_chunk": translated_text, "failed_attempts": 0}
+
+# First `{` through last `}` — tolerant of fences, prose, trailing chatter.
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+
+def _extract_critic_json(content: str) -> Dict[str, Any]:
+    """
+    Pulls the verdict object out of the critic's reply without the brittle
+    ```-splitting: locate the outermost braces, then raw_decode from there
+    so trailing text after the object can't break parsing.
+    """
+    match = _JSON_OBJECT_RE.search(content)
+    if not match:
+        raise ValueError("No JSON object in critic reply")
+    result, _ = _JSON_DECODER.raw_decode(content, match.start())
+    return result
+
+# --- Critic verdict cache ---
+# The fixer loop re-runs the critic on every iteration, and reruns of the
+# pipeline re-judge identical (original, translated) pairs. Verdicts are
+# deterministic (temperature 0), so they are memoized in a small sqlite DB
+# shared with the terminology cache directory.
+
+_CRITIC_DB_PATH = os.path.join(
+    os.path.expanduser("~/.cache/arxiv_translator"), "critic_cache.db"
+)
+_critic_db: Optional[sqlite3.Connection] = None
+_critic_db_lock = threading.Lock()
+
+def _get_critic_db() -> sqlite3.Connection:
+    global _critic_db
+    if _critic_db is None:
+        os.makedirs(os.path.dirname(_CRITIC_DB_PATH), exist_ok=True)
+        # check_same_thread=False: the connection is shared across the event
+        # loop's worker threads; _critic_db_lock serializes access.
+        _critic_db = sqlite3.connect(_CRITIC_DB_PATH, check_same_thread=False)
+        _critic_db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts (key TEXT PRIMARY KEY, errors TEXT)"
+        )
+        _critic_db.commit()
+    return _critic_db
+
+def _critic_key(original: str, translated: str) -> str:
+    payload = (original + "\x1f" + translated).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def _critic_cache_get(key: str) -> Optional[List[str]]:
+    try:
+        with _critic_db_lock:
+            row = _get_critic_db().execute(
+                "SELECT errors FROM verdicts WHERE key = ?", (key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception as e:
+        logger.debug(f"Critic cache read failed: {e}")
+        return None
+
+def _critic_cache_put(key: str, errors: List[str]):
+    try:
+        with _critic_db_lock:
+            db = _get_critic_db()
+            db.execute(
+                "INSERT OR REPLACE INTO verdicts (key, errors) VALUES (?, ?)",
+                (key, json.dumps(errors, ensure_ascii=False))
+            )
+            db.commit()
+    except Exception as e:
+        logger.debug(f"Critic cache write failed: {e}")
 
-def critic_node(state: TranslationState):
+async def critic_node(state: TranslationState):
     """
     Node D: Critic
     """
     logger.debug("Running Critic")
-    
+
     original = state['original_chunk']
     translated = state['translated_chunk']
-    
-    model_name = os.getenv("MODEL_NAME", "gpt-4o")
-    base_url = os.getenv("OPENAI_BASE_URL")
-    llm = ChatOpenAI(model=model_name, temperature=0.0, base_url=base_url) # Critic needs to be strict
-    prompt = PromptTemplate.from_template(CRITIC_SYSTEM_PROMPT)
-    chain = prompt | llm
-    
+
+    cache_key = _critic_key(original, translated)
+    cached = _critic_cache_get(cache_key)
+    if cached is not None:
+        return {"critic_errors": cached}
+
+    chain = _critic_chain() # Temperature 0: critic needs to be strict
+
+
     try:
-        response = chain.invoke({
+        response = await _invoke_with_retry(chain, {
             "original_chunk": original,
             "translated_chunk": translated
         })
-        content = response.content.strip()
-        
-        # Parse JSON
-        if "```json" in content:
-            content = content.split("```json")[1].split("```")[0].strip()
-        elif "```" in content:
-            content = content.split("```")[1].strip()
-            
-        result = json.loads(content)
+        result = _extract_critic_json(response.content)
         
         is_safe = result.get("safe", False)
         is_syntax = result.get("syntax_valid", False)
@@ -129,19 +405,22 @@ def critic_node(state: TranslationState):
         errors = result.get("errors", [])
         
         if is_safe and is_syntax and is_quality:
+            _critic_cache_put(cache_key, [])
             return {"critic_errors": []}
         else:
             if not errors:
                 errors.append("Unknown failure")
+            _critic_cache_put(cache_key, errors)
             return {"critic_errors": errors}
-            
+
     except Exception as e:
         logger.error(f"Critic failed to parse: {e}")
+        # Transient parse/transport failures are not cached.
         # If critic fails, we warn but maybe proceed? Or force retry?
         # Unsafe to proceed. 
         return {"critic_errors": ["Critic parsing failed"]}
 
-def fixer_node(state: TranslationState):
+async def fixer_node(state: TranslationState):
     """
     Node D (Branch): Fixer
     """
@@ -159,17 +438,14 @@ def fixer_node(state: TranslationState):
 
     original = state['original_chunk']
     translated = state['translated_chunk']
-    errors = json.dumps(state['critic_errors'], ensure_ascii=False)
-    terminology = json.dumps(state['terminology'], ensure_ascii=False)
-    
-    model_name = os.getenv("MODEL_NAME", "gpt-4o")
-    base_url = os.getenv("OPENAI_BASE_URL")
-    llm = ChatOpenAI(model=model_name, temperature=0.2, base_url=base_url)
-    prompt = PromptTemplate.from_template(FIXER_SYSTEM_PROMPT)
-    chain = prompt | llm
+    errors = orjson.dumps(state['critic_errors']).decode()
+    terminology = state['terminology_json']
     
+    chain = _fixer_chain()
+
+
     try:
-        response = chain.invoke({
+        response = await _invoke_with_retry(chain, {
             "original_chunk": original,
             "translated_chunk": translated,
             "errors": errors,
@@ -184,24 +460,94 @@ def fixer_node(state: TranslationState):
         return {"translated_chunk": translated, "failed_attempts": failures}
 
 # --- Conditional Logic ---
+
+# Chunks consisting purely of markup: mask tokens, \begin/\end fences,
+# structural commands, and whitespace. Nothing a critic could judge.
+_MARKUP_ONLY_RE = re.compile(
+    r'(?:\s'
+    r'|\[MASK_[A-Z0-9_]+_\d{4}\]'
+    r'|\\(?:begin|end)\{[^}]*\}'
+    r'|\\(?:item|par|noindent|centering|hline|midrule|toprule|bottomrule)\b'
+    r')+'
+)
+
+def check_trivial(state: TranslationState):
+    """
+    Routes markup-heavy chunks straight to END after translation: a chunk
+    with almost no letters (mask tokens, tables of numbers, spacing) or one
+    that is pure markup gains nothing from a critic pass, which costs a
+    full LLM round-trip per chunk.
+    """
+    original = state['original_chunk']
+    alpha_ratio = sum(c.isalpha() for c in original) / max(1, len(original))
+    if alpha_ratio < 0.15 or _MARKUP_ONLY_RE.fullmatch(original):
+        return "trivial"
+    return "critic"
+
 def check_critic(state: TranslationState):
     errors = state.get("critic_errors", [])
     if not errors:
         return "pass"
     return "fail"
 
+def check_entry(state: TranslationState):
+    # Chunks pre-translated by the batched fast path skip straight to QA —
+    # or straight to END when they are markup-only: the dominant path
+    # enters here, so the trivial short-circuit must apply to it too.
+    if state.get("translated_chunk"):
+        if check_trivial(state) == "trivial":
+            return "done"
+        return "critic"
+    return "translate"
+
 # --- Graph Construction ---
+
+# Node-cache key: identical inputs short-circuit to the previous node
+# result, so restarted runs and re-translations of the same paper skip
+# straight to the cached output. translate_node raises on LLM failure
+# instead of returning a fallback state, so failures are never persisted.
+# The critic is NOT node-cached: its sqlite verdict cache above already
+# memoizes it durably, keyed on both sides of the pair, and deliberately
+# skips caching failures — a node cache on top would undo that.
+
+def _translate_cache_key(state: TranslationState) -> str:
+    payload = (
+        state.get("original_chunk", "") + "\x1f" + state.get("terminology_json", "")
+    ).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
 def build_graph():
     workflow = StateGraph(TranslationState)
-    
-    workflow.add_node("translate", translate_node)
+
+    if CachePolicy is not None:
+        workflow.add_node(
+            "translate", translate_node,
+            cache_policy=CachePolicy(key_func=_translate_cache_key)
+        )
+    else:
+        workflow.add_node("translate", translate_node)
     workflow.add_node("critic", critic_node)
     workflow.add_node("fixer", fixer_node)
-    
-    workflow.set_entry_point("translate")
-    
-    workflow.add_edge("translate", "critic")
-    
+
+    workflow.set_conditional_entry_point(
+        check_entry,
+        {
+            "translate": "translate",
+            "critic": "critic",
+            "done": END
+        }
+    )
+
+    workflow.add_conditional_edges(
+        "translate",
+        check_trivial,
+        {
+            "trivial": END,
+            "critic": "critic"
+        }
+    )
+
+
     workflow.add_conditional_edges(
         "critic",
         check_critic,
@@ -212,41 +558,157 @@ def build_graph():
     )
     
     workflow.add_edge("fixer", "critic") # Loop back to critic
-    
+
+    if CachePolicy is not None:
+        # Sqlite-backed store survives process restarts; fall back to the
+        # in-memory backend when the installed langgraph lacks it.
+        if SqliteCache is not None:
+            os.makedirs(os.path.dirname(_CRITIC_DB_PATH), exist_ok=True)
+            cache = SqliteCache(
+                path=os.path.join(os.path.dirname(_CRITIC_DB_PATH), "node_cache.db")
+            )
+            return workflow.compile(cache=cache)
+        if InMemoryCache is not None:
+            return workflow.compile(cache=InMemoryCache())
+
     return workflow.compile()
 
+# Compiled once on first use; the graph is stateless between invocations.
+# Lazy because compiling opens the sqlite node cache (creating the cache
+# directory), an import side effect that would leak into test collection.
+@lru_cache(maxsize=1)
+def _get_app():
+    return build_graph()
+
 # --- Main Interface ---
-def translate_file_content(masked_content: str, terminology: Dict[str, str]) -> str:
+
+# Separator used to pack several independent texts into one LLM request.
+# Kept on its own line surrounded by blank lines so smart_split never
+# breaks inside it, and so the model can reproduce it reliably.
+BATCH_SEPARATOR = "\n\n%%\n\n"
+# Split only on lines that are exactly `%%` (the prompt contract), not on
+# `%%` anywhere — inline occurrences ("95%% was observed") and `%%%%`
+# comment-divider lines must not fracture the batch. The surrounding
+# newlines are consumed to mirror what BATCH_SEPARATOR inserted.
+_BATCH_SPLIT_RE = re.compile(r'(?m)\n*^[ \t]*%%[ \t]*$\n*')
+
+async def translate_batch(texts: List[str], terminology: Dict[str, str]) -> List[str]:
+    """
+    Translates several independent masked texts in a single prompt,
+    joined by the `%%` separator. Falls back to per-item translation
+    if the model drops/merges separators.
+    """
+    if not texts:
+        return []
+    if len(texts) == 1:
+        return [await translate_file_content(texts[0], terminology)]
+
+    joined = BATCH_SEPARATOR.join(texts)
+    translated = await translate_file_content(joined, terminology)
+
+    parts = _BATCH_SPLIT_RE.split(translated)
+    if len(parts) == len(texts):
+        return parts
+
+    logger.warning(
+        f"Batch separator mismatch ({len(parts)} parts for {len(texts)} items). "
+        "Retrying items individually."
+    )
+    return [await translate_file_content(t, terminology) for t in texts]
+
+# Per-file cap on chunk subgraphs in flight; the caller-level semaphore
+# still bounds the total across files.
+MAX_CHUNK_CONCURRENCY = 5
+
+async def translate_file_content(masked_content: str, terminology: Dict[str, str]) -> str:
     """
     Orchestrates the chunking and translation of a file's content.
+    Chunks are independent, so their subgraphs run concurrently; wall time
+    approaches the slowest chunk instead of the sum.
     """
     # 1. Chunking
     chunks = smart_split(masked_content)
-    translated_chunks = []
-    
-    app = build_graph()
-    
+
+    # Serialized once here; every chunk, node invocation, and batched
+    # request reuses the same string instead of re-dumping the dict.
+    terminology_json = orjson.dumps(terminology).decode()
+
+    app = _get_app()
+
     logger.info(f"File split into {len(chunks)} chunks.")
-    
-    for i, chunk in enumerate(chunks):
-        # Skip empty chunks
-        if not chunk.strip():
-            translated_chunks.append(chunk)
-            continue
-            
+
+    semaphore = asyncio.Semaphore(MAX_CHUNK_CONCURRENCY)
+
+    # Batched first translation pass: one abatch call replaces N separate
+    # per-chunk round-trips (each with its own queuing delay). The graph
+    # then enters at the critic for these chunks; only failures pay for
+    # further LLM calls through the fixer loop.
+    # Partitioned once up front: translatable chunks take the batch/graph
+    # path, whitespace placeholders are spliced back by index untouched.
+    translatable = [(i, c) for i, c in enumerate(chunks) if c.strip()]
+    placeholders = {i: c for i, c in enumerate(chunks) if not c.strip()}
+
+    pretranslated: Dict[int, str] = {}
+    if translatable:
+        llm = _get_llm(0.3)
+        # Small chunks are marshalled K-at-a-time into delimited prompts,
+        # cutting the request count by ~K on fragment-heavy files.
+        groups = group_chunks_for_marshalling(translatable)
+        requests = []
+        for group in groups:
+            if len(group) == 1:
+                requests.append(build_translate_messages(group[0][1], terminology_json))
+            else:
+                requests.append(build_translate_messages(
+                    _marshal_group([c for _, c in group]), terminology_json))
+        try:
+            responses = await llm.abatch(requests, config={"max_concurrency": 8})
+            for group, response in zip(groups, responses):
+                text = response.content.strip()
+                if len(group) == 1:
+                    pretranslated[group[0][0]] = text
+                    continue
+                parts = _demarshal_group(text, len(group))
+                if parts is None:
+                    # Delimiter mismatch: leave these chunks unseeded so they
+                    # retry through the per-chunk translate node.
+                    logger.warning(f"Marshalled group of {len(group)} came back misaligned; retrying per chunk.")
+                    continue
+                for (i, _), part in zip(group, parts):
+                    pretranslated[i] = part.strip()
+        except Exception as e:
+            logger.warning(f"Batched translation pass failed: {e}. Falling back to per-chunk translate nodes.")
+
+    async def run_chunk(i: int, chunk: str) -> str:
         initial_state = {
             "original_chunk": chunk,
             "chunk_index": i,
+            "translated_chunk": pretranslated.get(i, ""),
             "terminology": terminology,
+            "terminology_json": terminology_json,
             "failed_attempts": 0,
             "critic_errors": [],
-            # Initialize other required keys for TypeDict but LangGraph handles partials?
-            # StateGraph requires keys to match if strictly typed? 
-            # Usually strict=False default. 
         }
-        
-        result = app.invoke(initial_state)
-        translated_chunks.append(result["translated_chunk"])
-        
+        try:
+            async with semaphore:
+                result = await app.ainvoke(initial_state)
+            return result["translated_chunk"]
+        except Exception as e:
+            # Per-chunk fallback for raised node failures (translate_node
+            # raises so the node cache never persists an outage): keep the
+            # batched pre-translation if one exists, else the original text.
+            logger.error(f"Chunk {i} failed: {e}. Falling back to untranslated text.")
+            return pretranslated.get(i) or chunk
+
+    # 2. Fan out over the translatable partition; results land back in
+    # their original slots alongside the untouched placeholders
+    translated_chunks: List[Optional[str]] = [None] * len(chunks)
+    for i, chunk in placeholders.items():
+        translated_chunks[i] = chunk
+
+    tasks = [(i, asyncio.ensure_future(run_chunk(i, chunk))) for i, chunk in translatable]
+    for i, task in tasks:
+        translated_chunks[i] = await task
+
     # Join
     return "".join(translated_chunks)
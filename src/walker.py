@@ -1,10 +1,42 @@
 import os
 import re
+import mmap
 import logging
-from typing import List, Set, Callable, Optional
+import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterator, List, Set, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+# \input{...} or \include{...}. Compiled once, reused across every file.
+# Bytes pattern so it runs directly over an mmap'd file without
+# materializing the content as a str. Deliberately not anchored to line
+# start: an anchored match consumes the whole line prefix, so only the
+# first include per line would ever match. Comments are filtered per match
+# in _scan_includes instead.
+_INCLUDE_RE = re.compile(rb'\\(?:input|include)\s*\{([^}]+)\}')
+
+def _in_comment(prefix: bytes) -> bool:
+    """True if the line prefix contains an unescaped %, i.e. a TeX comment
+    has started before this position."""
+    idx = prefix.find(b'%')
+    while idx != -1:
+        backslashes = 0
+        j = idx - 1
+        while j >= 0 and prefix[j:j + 1] == b'\\':
+            backslashes += 1
+            j -= 1
+        if backslashes % 2 == 0:
+            return True
+        idx = prefix.find(b'%', idx + 1)
+    return False
+
+@lru_cache(maxsize=4096)
+def _norm(path: str) -> str:
+    return os.path.normpath(path)
+
 def resolve_path(base_dir: str, current_file: str, relative_path: str) -> Optional[str]:
     """
     Resolves the absolute path of an included file.
@@ -25,33 +57,56 @@ def resolve_path(base_dir: str, current_file: str, relative_path: str) -> Option
     current_dir = os.path.dirname(current_file)
     path_from_current = os.path.join(current_dir, candidate)
     if os.path.exists(path_from_current):
-        return os.path.normpath(path_from_current)
-    
+        return _norm(path_from_current)
+
     # Check relative to base_dir (project root)
     path_from_root = os.path.join(base_dir, candidate)
     if os.path.exists(path_from_root):
-        return os.path.normpath(path_from_root)
-        
+        return _norm(path_from_root)
+
     return None
 
+# Directories that never hold project sources
+_SKIP_DIRS = frozenset({'.git', '__pycache__', 'node_modules'})
+
+def _iter_tex(root: str):
+    """
+    Yields .tex paths under root via os.scandir (no stat-list per directory
+    like os.walk), skipping hidden and VCS/build directories.
+    """
+    try:
+        entries = os.scandir(root)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if name.startswith('.') or name in _SKIP_DIRS:
+                    continue
+                yield from _iter_tex(entry.path)
+            elif name.endswith('.tex'):
+                yield entry.path
+
 def find_main_tex(sandbox_dir: str) -> Optional[str]:
     """
     Heuristic to find the main .tex file.
-    1. Look for file with \documentclass.
+    1. Look for file with \documentclass — checked in the first 8 KiB only,
+       since the preamble sits at the top; large generated .tex artifacts
+       are never read end-to-end.
     2. Prefer 'main.tex', 'paper.tex', 'ms.tex'.
     """
     candidates = []
-    
-    # Walk all files
-    for root, dirs, files in os.walk(sandbox_dir):
-        for f in files:
-            if f.endswith('.tex'):
-                full_path = os.path.join(root, f)
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as d:
-                    content = d.read()
-                    if '\\documentclass' in content:
-                        candidates.append(full_path)
-    
+
+    for full_path in _iter_tex(sandbox_dir):
+        try:
+            with open(full_path, 'rb') as f:
+                head = f.read(8192)
+        except OSError:
+            continue
+        if b'\\documentclass' in head:
+            candidates.append(full_path)
+
     if not candidates:
         return None
     
@@ -65,57 +120,110 @@ def find_main_tex(sandbox_dir: str) -> Optional[str]:
     # Default to first candidate
     return candidates[0]
 
-def walk_and_process(
-    sandbox_dir: str, 
-    entry_file: str, 
-    process_callback: Callable[[str], None]
-):
+def _scan_includes(path: str) -> List[str]:
+    """
+    Scans one file for \input/\include targets over an mmap'd view, so
+    discovery never copies file contents into Python strings (only the
+    matched path fragments are decoded).
+    """
+    try:
+        with open(path, 'rb') as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files cannot be mmap'd (and have no includes).
+                return []
+            with mm:
+                includes = []
+                for m in _INCLUDE_RE.finditer(mm):
+                    line_start = mm.rfind(b'\n', 0, m.start()) + 1
+                    if _in_comment(mm[line_start:m.start()]):
+                        continue
+                    includes.append(m.group(1).decode('utf-8', errors='ignore'))
+                return includes
+    except OSError as e:
+        logger.warning(f"Could not scan {path} for includes: {e}")
+        return []
+
+def _iter_discover(sandbox_dir: str, entry_file: str) -> Iterator[str]:
     """
-    Traverses the project starting from entry_file using DFS.
-    Calls process_callback(file_path) for each file.
+    Yields reachable files one at a time in discovery order.
+
+    Iterative DFS with an explicit deque — discovery is cheap (one regex per
+    file on disk) and no longer risks hitting the recursion limit on deeply
+    nested projects. Being a generator, callers can start processing a file
+    while later files are still being discovered.
     """
     visited: Set[str] = set()
-    
-    def dfs(current_path: str):
+    stack = deque([entry_file])
+
+    while stack:
+        current_path = stack.pop()
         if current_path in visited:
-            return
+            continue
         visited.add(current_path)
-        
-        logger.info(f"Processing: {current_path}")
-        
-        # 1. Process this file (Translate it inplace)
-        # Note: We process BEFORE diving into children, or AFTER?
-        # Usually process children first? Or process this file?
-        # Since we modify files inplace, order matters if we modify \input commands.
-        # But we DO NOT modify \input commands. We just translate content.
-        # So we can process this file first.
-        try:
-            process_callback(current_path)
-        except Exception as e:
-            logger.error(f"Error processing {current_path}: {e}")
-            
-        # 2. Find children
-        # We need to read the file AGAIN because it might have been modified? 
-        # No, the translation should preserve \input tags.
-        # But to be safe, read current content on disk.
+        yield current_path
+
         if not os.path.exists(current_path):
-            return 
-            
-        with open(current_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-        # Regex for input/include
-        # \input{...} or \include{...}
-        # Be careful of commented lines. Parser is safer but regex is faster for discovery.
-        # We'll use simple Regex for discovery as implemented in plan.
-        
-        includes = re.findall(r'\\(?:input|include)\s*\{([^}]+)\}', content)
-        
-        for inc_path in includes:
+            continue
+
+        # Regex for input/include discovery (precompiled, comment-filtered).
+        # Parser is safer but regex is faster for discovery.
+        for inc_path in _scan_includes(current_path):
             full_inc_path = resolve_path(sandbox_dir, current_path, inc_path)
             if full_inc_path:
-                dfs(full_inc_path)
+                if full_inc_path not in visited:
+                    stack.append(full_inc_path)
             else:
                 logger.warning(f"Could not resolve include: {inc_path} in {current_path}")
 
-    dfs(entry_file)
+def discover_files(sandbox_dir: str, entry_file: str) -> List[str]:
+    """
+    Traverses the project starting from entry_file following \input/\include
+    and returns the reachable files in discovery order.
+    """
+    return list(_iter_discover(sandbox_dir, entry_file))
+
+def _safe_process(process_callback: Callable[[str], None], file_path: str):
+    logger.info(f"Processing: {file_path}")
+    try:
+        process_callback(file_path)
+    except Exception as e:
+        logger.error(f"Error processing {file_path}: {e}")
+
+def walk_and_process(
+    sandbox_dir: str,
+    entry_file: str,
+    process_callback: Callable[[str], None],
+    max_workers: int = 8
+):
+    """
+    Traverses the project starting from entry_file and calls
+    process_callback(file_path) for each reachable file.
+
+    Producer/consumer: discovery feeds a bounded queue as files are found
+    while worker threads pull and process, so processing of file N overlaps
+    discovery of file N+1 instead of waiting for the full walk. The callback
+    is typically network- or IO-bound, so the files no longer wait on one
+    another either. Translation preserves \input tags, so processing order
+    does not affect discovery.
+    """
+    work: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=max_workers * 2)
+
+    def consume():
+        while True:
+            path = work.get()
+            if path is None:
+                return
+            _safe_process(process_callback, path)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as ex:
+        consumers = [ex.submit(consume) for _ in range(max_workers)]
+        try:
+            for path in _iter_discover(sandbox_dir, entry_file):
+                work.put(path)
+        finally:
+            for _ in consumers:
+                work.put(None)
+        for c in consumers:
+            c.result()
@@ -1,16 +1,21 @@
-try:
-    import argparse
-    print("argparse ok")
-    import src.context
-    print("src.context ok")
-    import src.parser
-    print("src.parser ok")
-    import src.translator
-    print("src.translator ok")
-    import src.walker
-    print("src.walker ok")
-    import src.compiler
-    print("src.compiler ok")
+import importlib
+
+
+def test_all_imports():
+    # Imported lazily inside the test so collection doesn't eagerly pull in
+    # the heavy langgraph/langchain stack.
+    for module in (
+        "argparse",
+        "src.context",
+        "src.parser",
+        "src.translator",
+        "src.walker",
+        "src.compiler",
+    ):
+        assert importlib.import_module(module)
+        print(f"{module} ok")
     print("All imports ok")
-except Exception as e:
-    print(f"Import failed: {e}")
+
+
+if __name__ == "__main__":
+    test_all_imports()